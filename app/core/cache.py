@@ -1,55 +1,196 @@
 # app/core/cache.py
-import json
+import heapq
+import time
+from collections import OrderedDict
 from typing import Optional, Any
-from datetime import datetime, timedelta
+
+import orjson
+
+from app.core.config import settings
 from app.core.logging import logger
 
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # Redis is optional, SimpleCache is used without it
+    aioredis = None
+    RedisError = Exception  # never raised: RedisCache requires the redis package
+
+# Only keys under this prefix belong to the app (the Redis database may be shared)
+KEY_PATTERN = "prediction:*"
+
 class SimpleCache:
-    """Simple in-memory cache (replace with Redis in production)"""
+    """Simple in-memory LRU cache with TTL (used when REDIS_URL is not set)"""
     
-    def __init__(self):
-        self._cache = {}
-        self._expiry = {}
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        # key -> (value, expires_at) in LRU order; expires_at is a time.monotonic() deadline
+        self._cache = OrderedDict()
+        # Min-heap of (expires_at, key); entries are validated lazily on cleanup
+        self._exp_heap = []
+        self.hits = 0
+        self.misses = 0
     
-    def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        if key in self._cache:
-            # Check if expired
-            if key in self._expiry and datetime.now() > self._expiry[key]:
-                self.delete(key)
-                logger.info(f"Cache expired for key: {key}")
-                return None
-            
-            logger.info(f"Cache hit for key: {key}")
-            return self._cache[key]
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            logger.debug("Cache miss for key: %s", key)
+            return None
+        
+        value, expires_at = entry
+        # Check if expired
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            self.misses += 1
+            logger.debug("Cache expired for key: %s", key)
+            return None
         
-        logger.info(f"Cache miss for key: {key}")
-        return None
+        self._cache.move_to_end(key)
+        self.hits += 1
+        logger.debug("Cache hit for key: %s", key)
+        return value
     
-    def set(self, key: str, value: Any, ttl: int = 600):
+    async def set(self, key: str, value: Any, ttl: int = 600):
         """Set value in cache with TTL in seconds"""
-        self._cache[key] = value
-        self._expiry[key] = datetime.now() + timedelta(seconds=ttl)
-        logger.info(f"Cache set for key: {key}, TTL: {ttl}s")
+        expires_at = time.monotonic() + ttl
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        elif len(self._cache) >= self.max_size:
+            # Evict least recently used
+            self._cache.popitem(last=False)
+        self._cache[key] = (value, expires_at)
+        heapq.heappush(self._exp_heap, (expires_at, key))
+        logger.debug("Cache set for key: %s, TTL: %ss", key, ttl)
     
-    def delete(self, key: str):
+    async def delete(self, key: str):
         """Delete value from cache"""
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._expiry:
-            del self._expiry[key]
-        logger.info(f"Cache deleted for key: {key}")
+        self._cache.pop(key, None)
+        logger.debug("Cache deleted for key: %s", key)
     
-    def clear(self):
+    async def clear(self):
         """Clear all cache"""
         self._cache.clear()
-        self._expiry.clear()
-        logger.info("Cache cleared")
+        self._exp_heap.clear()
+        logger.debug("Cache cleared")
     
-    def size(self) -> int:
+    def cleanup_expired(self) -> int:
+        """Remove expired entries, returns number of entries removed"""
+        now = time.monotonic()
+        removed = 0
+        while self._exp_heap and self._exp_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._exp_heap)
+            entry = self._cache.get(key)
+            # Skip stale heap entries (key deleted, evicted or re-set since)
+            if entry is not None and entry[1] == expires_at:
+                del self._cache[key]
+                removed += 1
+        return removed
+    
+    async def size(self) -> int:
         """Get cache size"""
         return len(self._cache)
+    
+    async def close(self):
+        """Nothing to release for the in-memory cache"""
+        pass
+
+
+class RedisCache:
+    """Redis cache shared across workers, fronted by a small in-process tier"""
+    
+    def __init__(self, url: str, local_max_size: int = 128, local_ttl: int = 5):
+        if aioredis is None:
+            raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed")
+        self.pool = aioredis.ConnectionPool.from_url(url, max_connections=32)
+        self.client = aioredis.Redis(connection_pool=self.pool)
+        # Hottest keys are served without a Redis round-trip
+        self._local = SimpleCache(max_size=local_max_size)
+        self.local_ttl = local_ttl
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from local tier, falling back to Redis"""
+        value = await self._local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        # Redis being down degrades to a miss; the local tier keeps serving
+        try:
+            raw = await self.client.get(key)
+        except RedisError as e:
+            logger.warning("Redis get failed for key %s: %s", key, e)
+            self.misses += 1
+            return None
+        if raw is None:
+            self.misses += 1
+            logger.debug("Cache miss for key: %s", key)
+            return None
+        
+        # Bytes are stored verbatim, anything else as orjson-encoded JSON
+        value = raw[1:] if raw[:1] == b"b" else orjson.loads(raw[1:])
+        await self._local.set(key, value, ttl=self.local_ttl)
+        self.hits += 1
+        logger.debug("Cache hit for key: %s", key)
+        return value
+    
+    async def set(self, key: str, value: Any, ttl: int = 600):
+        """Set value in Redis and the local tier with TTL in seconds"""
+        if isinstance(value, bytes):
+            raw = b"b" + value
+        else:
+            raw = b"j" + orjson.dumps(value)
+        try:
+            await self.client.setex(key, ttl, raw)
+        except RedisError as e:
+            logger.warning("Redis set failed for key %s: %s", key, e)
+        await self._local.set(key, value, ttl=min(ttl, self.local_ttl))
+    
+    async def delete(self, key: str):
+        """Delete value from both tiers"""
+        try:
+            await self.client.delete(key)
+        except RedisError as e:
+            logger.warning("Redis delete failed for key %s: %s", key, e)
+        await self._local.delete(key)
+    
+    async def clear(self):
+        """Clear this app's keys (not the whole Redis database)"""
+        try:
+            keys = [key async for key in self.client.scan_iter(match=KEY_PATTERN, count=500)]
+            if keys:
+                await self.client.delete(*keys)
+        except RedisError as e:
+            logger.warning("Redis clear failed: %s", e)
+        await self._local.clear()
+    
+    def cleanup_expired(self) -> int:
+        """Sweep the local tier (Redis expires its own keys)"""
+        return self._local.cleanup_expired()
+    
+    async def size(self) -> int:
+        """Get number of keys in Redis (local tier size if Redis is unreachable)"""
+        try:
+            return await self.client.dbsize()
+        except RedisError as e:
+            logger.warning("Redis size failed: %s", e)
+            return await self._local.size()
+    
+    async def close(self):
+        """Close Redis connections"""
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+
+def create_cache():
+    """Use Redis when REDIS_URL is configured, otherwise an in-memory cache"""
+    if settings.REDIS_URL:
+        return RedisCache(settings.REDIS_URL)
+    return SimpleCache(max_size=settings.CACHE_MAX_SIZE)
 
 
 # Global cache instance
-cache = SimpleCache()
+cache = create_cache()
@@ -1,5 +1,6 @@
 # app/core/config.py
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 class Settings(BaseSettings):
@@ -18,6 +19,9 @@ class Settings(BaseSettings):
     # Cache Configuration
     CACHE_ENABLED: bool = True
     CACHE_TTL: int = 600  # 10 minutes
+    CACHE_MAX_SIZE: int = 1000
+    CACHE_CLEANUP_INTERVAL: int = 60  # seconds
+    REDIS_URL: Optional[str] = None  # e.g. "redis://localhost:6379/0"
     
     # Rate Limiting
     RATE_LIMIT_ENABLED: bool = True
@@ -30,8 +34,22 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: list = ["*"]
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        frozen=True,
+        validate_default=False
+    )
 
-settings = Settings()
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings on first use and reuse them for the process lifetime"""
+    return Settings()
+
+
+def __getattr__(name):
+    # Keep `from app.core.config import settings` working without loading at import time
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
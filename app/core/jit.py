@@ -0,0 +1,11 @@
+# app/core/jit.py
+"""Numba JIT decorator with a pure-Python fallback when numba isn't installed"""
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, kernels then run as plain Python
+    def njit(*args, **kwargs):
+        # Support both @njit and @njit(cache=True)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
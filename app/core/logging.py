@@ -59,3 +59,6 @@ def setup_logging(log_level: str = "INFO", log_format: str = "json"):
 
 # Create default logger
 logger = setup_logging()
+
+# Per-request access log (child of "stock_api", shares its handlers)
+access_logger = logging.getLogger("stock_api.access")
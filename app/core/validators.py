@@ -1,25 +1,37 @@
 # app/core/validators.py
-import re
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 from app.core.exceptions import InvalidSymbolError
 
-def validate_stock_symbol(symbol: str) -> str:
+@lru_cache(maxsize=4096)
+def _validate_cached(symbol: str) -> Tuple[bool, str]:
     """
-    Validate stock symbol format
-    - Must be 1-5 uppercase letters
-    - No special characters or numbers
+    Memoized symbol check, returns (ok, normalized symbol or the value to report)
+    - Errors are returned rather than raised since lru_cache doesn't cache exceptions
     """
     if not symbol:
-        raise InvalidSymbolError("empty")
+        return False, "empty"
     
     # Convert to uppercase
     symbol = symbol.upper().strip()
     
-    # Check format
-    if not re.match(r'^[A-Z]{1,5}$', symbol):
-        raise InvalidSymbolError(symbol)
+    # Check format (equivalent to ^[A-Z]{1,5}$ without the regex engine)
+    if not (1 <= len(symbol) <= 5 and symbol.isascii() and symbol.isalpha() and symbol.isupper()):
+        return False, symbol
+    
+    return True, symbol
+
+def validate_stock_symbol(symbol: str) -> str:
+    """
+    Validate stock symbol format
+    - Must be 1-5 uppercase letters
+    - No special characters or numbers
+    """
+    ok, result = _validate_cached(symbol)
+    if not ok:
+        raise InvalidSymbolError(result)
     
-    return symbol
+    return result
 
 def validate_symbols_batch(symbols: List[str], max_batch_size: int = 10) -> List[str]:
     """Validate batch of stock symbols"""
@@ -29,8 +41,9 @@ def validate_symbols_batch(symbols: List[str], max_batch_size: int = 10) -> List
     if len(symbols) > max_batch_size:
         raise InvalidSymbolError(f"Batch size exceeds maximum of {max_batch_size}")
     
-    validated = []
-    for symbol in symbols:
-        validated.append(validate_stock_symbol(symbol))
+    results = [_validate_cached(symbol) for symbol in symbols]
+    if not all(ok for ok, _ in results):
+        # Report the first invalid symbol
+        raise InvalidSymbolError(next(result for ok, result in results if not ok))
     
-    return validated
+    return [result for _, result in results]
@@ -2,16 +2,64 @@
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import time
+import httpx
 
 from app.core.config import settings
-from app.core.logging import logger
+from app.core.logging import logger, access_logger
+from app.core.cache import cache
 from app.core.exceptions import StockAPIException
 from app.routes import predict, health, metrics
 from app.models.schemas import ErrorResponse
+from app.services.lstm_service import load_lstm_model
+from app.services.xgb_service import load_xgb_model
+
+# Periodic sweep of expired cache entries
+async def cache_cleanup_loop():
+    while True:
+        await asyncio.sleep(settings.CACHE_CLEANUP_INTERVAL)
+        removed = cache.cleanup_expired()
+        if removed:
+            logger.info(f"Cache cleanup removed {removed} expired entries")
+
+# Startup / shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(
+        f"Starting {settings.APP_NAME} v{settings.APP_VERSION}",
+        extra={"debug": settings.DEBUG}
+    )
+    
+    # Load both models in parallel off the event loop
+    try:
+        app.state.lstm_model, app.state.xgb_model = await asyncio.gather(
+            asyncio.to_thread(load_lstm_model),
+            asyncio.to_thread(load_xgb_model)
+        )
+        logger.info("Models loaded successfully")
+    except Exception as e:
+        logger.error(f"Failed to load models: {e}")
+        app.state.lstm_model = None
+        app.state.xgb_model = None
+    
+    app.state.models_loaded = health.check_models_exist()
+    app.state.models_checked_at = time.monotonic()
+    app.state.cache_cleanup_task = asyncio.create_task(cache_cleanup_loop())
+    # Shared HTTP client so data fetches reuse pooled connections
+    app.state.http = httpx.AsyncClient()
+    
+    yield
+    
+    app.state.cache_cleanup_task.cancel()
+    await cache.close()
+    await app.state.http.aclose()
+    logger.info(f"Shutting down {settings.APP_NAME}")
 
 # Create FastAPI app
 app = FastAPI(
@@ -19,55 +67,70 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="Advanced Stock Prediction API with ML models",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS Middleware
+# Origins as a frozenset make the per-request membership test O(1). Credentials
+# can't be combined with a wildcard origin, so only allow them for explicit origins.
+CORS_ORIGINS = frozenset(settings.CORS_ORIGINS)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials="*" not in CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    # Log request
-    logger.info(
-        "Incoming request",
-        extra={
-            "method": request.method,
-            "url": str(request.url),
-            "client": request.client.host if request.client else "unknown"
-        }
-    )
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Calculate duration
-    duration = time.time() - start_time
-    
-    # Log response
-    logger.info(
-        "Request completed",
-        extra={
-            "method": request.method,
-            "url": str(request.url),
-            "status_code": response.status_code,
-            "duration_ms": round(duration * 1000, 2)
-        }
-    )
-    
-    # Add custom headers
-    response.headers["X-Process-Time"] = str(duration)
-    response.headers["X-API-Version"] = settings.APP_VERSION
-    
-    return response
+# Request timing middleware (pure ASGI, avoids BaseHTTPMiddleware overhead)
+QUIET_PATHS = frozenset({"/health", "/health/live", "/health/ready", "/metrics"})
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        client_host = (scope.get("client") or ("unknown",))[0]
+
+        # Probes and metrics scrapes are logged at DEBUG to keep the access log quiet
+        level = logging.DEBUG if path in QUIET_PATHS else logging.INFO
+
+        # Log request
+        if access_logger.isEnabledFor(logging.DEBUG):
+            access_logger.debug(
+                "Incoming request %s %s from %s", method, path, client_host
+            )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                duration = time.perf_counter() - start_time
+
+                # Add custom headers
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", f"{duration:.6f}".encode()))
+                headers.append((b"x-api-version", settings.APP_VERSION.encode()))
+                message["headers"] = headers
+
+                # Log response
+                if access_logger.isEnabledFor(level):
+                    access_logger.log(
+                        level, "%s %s %d %.2fms client=%s",
+                        method, path, message["status"], duration * 1000, client_host
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+app.add_middleware(TimingMiddleware)
 
 # Exception handlers
 @app.exception_handler(StockAPIException)
@@ -76,23 +139,23 @@ async def stock_api_exception_handler(request: Request, exc: StockAPIException):
         f"Stock API Exception: {exc.detail}",
         extra={"status_code": exc.status_code}
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(
             error=exc.__class__.__name__,
             detail=exc.detail
-        ).model_dump(mode='json')
+        ).model_dump()
     )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"Validation error: {exc.errors()}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content=ErrorResponse(
             error="ValidationError",
             detail=str(exc.errors())
-        ).model_dump(mode='json')
+        ).model_dump()
     )
 
 @app.exception_handler(Exception)
@@ -102,27 +165,14 @@ async def general_exception_handler(request: Request, exc: Exception):
         extra={"exception_type": type(exc).__name__},
         exc_info=True
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=ErrorResponse(
             error="InternalServerError",
             detail="An unexpected error occurred. Please try again later."
-        ).model_dump(mode='json')
+        ).model_dump()
     )
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info(
-        f"Starting {settings.APP_NAME} v{settings.APP_VERSION}",
-        extra={"debug": settings.DEBUG}
-    )
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info(f"Shutting down {settings.APP_NAME}")
-
 # Include routers
 app.include_router(predict.router, prefix="/api/v1", tags=["Predictions"])
 app.include_router(health.router, tags=["Health"])
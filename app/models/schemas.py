@@ -1,7 +1,13 @@
 # app/models/schemas.py
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, ready for serialization"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
 
 class PredictionRequest(BaseModel):
     symbol: str = Field(..., description="Stock ticker symbol (e.g., AAPL)")
@@ -18,7 +24,7 @@ class PredictionResponse(BaseModel):
     predicted_price: float
     signal: str
     confidence: float
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: str = Field(default_factory=utc_now_iso)
     model_version: str
     cached: bool = False
     
@@ -29,7 +35,7 @@ class PredictionResponse(BaseModel):
                 "predicted_price": 175.32,
                 "signal": "BUY",
                 "confidence": 0.87,
-                "timestamp": "2026-02-27T10:30:00",
+                "timestamp": "2026-02-27T10:30:00+00:00",
                 "model_version": "v2.1",
                 "cached": False
             }
@@ -54,7 +60,7 @@ class BatchPredictionResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     version: str
-    timestamp: datetime
+    timestamp: str = Field(default_factory=utc_now_iso)
     models_loaded: bool
     cache_size: int
 
@@ -68,13 +74,13 @@ class MetricsResponse(BaseModel):
 class ErrorResponse(BaseModel):
     error: str
     detail: str
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: str = Field(default_factory=utc_now_iso)
     
     class Config:
         json_schema_extra = {
             "example": {
                 "error": "InvalidSymbolError",
                 "detail": "Invalid stock symbol: ABC123",
-                "timestamp": "2026-02-27T10:30:00"
+                "timestamp": "2026-02-27T10:30:00+00:00"
             }
         }
@@ -1,8 +1,8 @@
 # app/routes/health.py
 
-from fastapi import APIRouter
-from datetime import datetime
+from fastapi import APIRouter, Request
 import os
+import time
 
 from app.core.config import settings
 from app.core.cache import cache
@@ -10,8 +10,27 @@ from app.models.schemas import HealthResponse
 
 router = APIRouter()
 
+MODEL_FILES = ("app/models/lstm_model.pth", "app/models/xgb_model.pkl")
+MODELS_RECHECK_INTERVAL = 30  # seconds
+
+
+def check_models_exist() -> bool:
+    """Check that all model files are present on disk"""
+    return all(os.path.exists(path) for path in MODEL_FILES)
+
+
+def models_loaded(request: Request) -> bool:
+    """Model availability computed at startup, rechecked at most every 30s"""
+    state = request.app.state
+    now = time.monotonic()
+    if now - state.models_checked_at >= MODELS_RECHECK_INTERVAL:
+        state.models_loaded = check_models_exist()
+        state.models_checked_at = now
+    return state.models_loaded
+
+
 @router.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(request: Request):
     """
     Health check endpoint
     
@@ -21,26 +40,19 @@ async def health_check():
     - Models loaded status
     - Cache size
     """
-    # Check if models exist
-    lstm_model_exists = os.path.exists("app/models/lstm_model.pth")
-    xgb_model_exists = os.path.exists("app/models/xgb_model.pkl")
-    models_loaded = lstm_model_exists and xgb_model_exists
+    loaded = models_loaded(request)
     
     return HealthResponse(
-        status="healthy" if models_loaded else "degraded",
+        status="healthy" if loaded else "degraded",
         version=settings.APP_VERSION,
-        timestamp=datetime.now(),
-        models_loaded=models_loaded,
-        cache_size=cache.size()
+        models_loaded=loaded,
+        cache_size=await cache.size()
     )
 
 @router.get("/health/ready")
-async def readiness_check():
+async def readiness_check(request: Request):
     """Kubernetes readiness probe"""
-    lstm_model_exists = os.path.exists("app/models/lstm_model.pth")
-    xgb_model_exists = os.path.exists("app/models/xgb_model.pkl")
-    
-    if lstm_model_exists and xgb_model_exists:
+    if models_loaded(request):
         return {"status": "ready"}
     return {"status": "not ready"}, 503
 
@@ -1,7 +1,7 @@
 # app/routes/metrics.py
 
 from fastapi import APIRouter
-from datetime import datetime
+from array import array
 import time
 
 from app.core.config import settings
@@ -11,31 +11,21 @@ from app.models.schemas import MetricsResponse
 router = APIRouter()
 
 # Track metrics (in-memory, replace with database in production)
-_metrics = {
-    "total_predictions": 0,
-    "cache_hits": 0,
-    "cache_misses": 0,
-    "total_requests": 0,
-    "total_response_time": 0.0,
-    "start_time": time.time()
-}
+# Counters live in flat typed arrays: one indexed in-place add per update
+# Cache hits/misses are counted by the cache itself
+TOTAL_PREDICTIONS, TOTAL_REQUESTS = range(2)
+_counters = array("q", [0, 0])
+_total_response_time = array("d", [0.0])
+_start_time = time.time()
 
 def increment_prediction():
     """Increment prediction counter"""
-    _metrics["total_predictions"] += 1
-
-def increment_cache_hit():
-    """Increment cache hit counter"""
-    _metrics["cache_hits"] += 1
-
-def increment_cache_miss():
-    """Increment cache miss counter"""
-    _metrics["cache_misses"] += 1
+    _counters[TOTAL_PREDICTIONS] += 1
 
 def record_response_time(duration: float):
     """Record response time"""
-    _metrics["total_requests"] += 1
-    _metrics["total_response_time"] += duration
+    _counters[TOTAL_REQUESTS] += 1
+    _total_response_time[0] += duration
 
 @router.get("/metrics", response_model=MetricsResponse)
 async def get_metrics():
@@ -49,22 +39,24 @@ async def get_metrics():
     - Model version
     - Uptime
     """
-    total_cache_requests = _metrics["cache_hits"] + _metrics["cache_misses"]
+    total_predictions, total_requests = _counters
+    
+    total_cache_requests = cache.hits + cache.misses
     cache_hit_rate = (
-        _metrics["cache_hits"] / total_cache_requests 
+        cache.hits / total_cache_requests 
         if total_cache_requests > 0 else 0.0
     )
     
     avg_response_time = (
-        _metrics["total_response_time"] / _metrics["total_requests"]
-        if _metrics["total_requests"] > 0 else 0.0
+        _total_response_time[0] / total_requests
+        if total_requests > 0 else 0.0
     )
     
-    uptime_seconds = time.time() - _metrics["start_time"]
+    uptime_seconds = time.time() - _start_time
     uptime_str = f"{int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m"
     
     return MetricsResponse(
-        total_predictions=_metrics["total_predictions"],
+        total_predictions=total_predictions,
         cache_hit_rate=round(cache_hit_rate, 4),
         average_response_time=round(avg_response_time * 1000, 2),  # ms
         model_version=settings.MODEL_VERSION,
@@ -74,11 +66,12 @@ async def get_metrics():
 @router.post("/metrics/reset")
 async def reset_metrics():
     """Reset metrics (admin only in production)"""
-    _metrics["total_predictions"] = 0
-    _metrics["cache_hits"] = 0
-    _metrics["cache_misses"] = 0
-    _metrics["total_requests"] = 0
-    _metrics["total_response_time"] = 0.0
-    _metrics["start_time"] = time.time()
+    global _start_time
+    for i in range(len(_counters)):
+        _counters[i] = 0
+    _total_response_time[0] = 0.0
+    cache.hits = 0
+    cache.misses = 0
+    _start_time = time.time()
     
     return {"message": "Metrics reset successfully"}
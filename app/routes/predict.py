@@ -1,10 +1,15 @@
 # app/routes/predict.py
 
-from fastapi import APIRouter, Depends, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response
+from starlette.datastructures import State
+from functools import lru_cache
+from typing import List, Optional
+import asyncio
+import zlib
 import json
 from datetime import datetime
 import numpy as np
+import orjson
 import pandas as pd
 
 from app.core.config import settings
@@ -18,58 +23,41 @@ from app.models.schemas import (
     BatchPredictionRequest,
     BatchPredictionResponse
 )
-from app.services.data_service import get_stock_data
-from app.services.lstm_service import load_lstm_model, predict_price
-from app.services.xgb_service import load_xgb_model, predict_signal
+from app.services.data_service import fetch_stock_data
+from app.services.lstm_service import predict_price
+from app.services.xgb_service import MIN_HISTORY, predict_signal, predict_signals_batch
 
 router = APIRouter()
 
-# Load models at startup
-try:
-    lstm_model = load_lstm_model()
-    xgb_model = load_xgb_model()
-    logger.info("Models loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load models: {e}")
-    lstm_model = None
-    xgb_model = None
 
+def get_app_state(request: Request) -> State:
+    """App state holding the models and HTTP client created on startup"""
+    return request.app.state
 
-def get_prediction_from_cache(symbol: str):
-    """Get prediction from cache if available"""
+
+async def get_prediction_from_cache(symbol: str) -> Optional[bytes]:
+    """Get serialized prediction from cache if available"""
     if not settings.CACHE_ENABLED:
         return None
     
     cache_key = f"prediction:{symbol}"
-    cached_data = cache.get(cache_key)
-    
-    if cached_data:
-        logger.info(f"Cache hit for symbol: {symbol}")
-        return cached_data
-    
-    return None
+    return await cache.get(cache_key)
 
 
-def save_prediction_to_cache(symbol: str, prediction: dict):
-    """Save prediction to cache"""
+async def save_prediction_to_cache(symbol: str, prediction: PredictionResponse):
+    """Save prediction to cache as the JSON body served on a cache hit"""
     if not settings.CACHE_ENABLED:
         return
     
     cache_key = f"prediction:{symbol}"
-    cache.set(cache_key, prediction, ttl=settings.CACHE_TTL)
-    logger.info(f"Cached prediction for symbol: {symbol}")
+    payload = orjson.dumps(prediction.model_copy(update={"cached": True}).model_dump())
+    await cache.set(cache_key, payload, ttl=settings.CACHE_TTL)
 
 
-async def make_prediction(symbol: str) -> PredictionResponse:
-    """Core prediction logic"""
-    # Validate symbol
-    symbol = validate_stock_symbol(symbol)
-    
-    # Check cache
-    cached_prediction = get_prediction_from_cache(symbol)
-    if cached_prediction:
-        cached_prediction["cached"] = True
-        return PredictionResponse(**cached_prediction)
+async def generate_prediction(symbol: str, state: State) -> PredictionResponse:
+    """Run the models for an already validated symbol and cache the result"""
+    lstm_model = state.lstm_model
+    xgb_model = state.xgb_model
     
     # Check if models are loaded
     if lstm_model is None or xgb_model is None:
@@ -78,7 +66,7 @@ async def make_prediction(symbol: str) -> PredictionResponse:
     try:
         # Fetch stock data
         logger.info(f"Fetching data for symbol: {symbol}")
-        df = get_stock_data(symbol)
+        df = await fetch_stock_data(state.http, symbol)
         
         # Make predictions
         logger.info(f"Making predictions for symbol: {symbol}")
@@ -91,13 +79,12 @@ async def make_prediction(symbol: str) -> PredictionResponse:
             predicted_price=float(predicted_price),
             signal=signal,
             confidence=float(confidence),
-            timestamp=datetime.now(),
             model_version=settings.MODEL_VERSION,
             cached=False
         )
         
         # Save to cache
-        save_prediction_to_cache(symbol, prediction.dict())
+        await save_prediction_to_cache(symbol, prediction)
         
         logger.info(
             f"Prediction successful for {symbol}",
@@ -117,8 +104,75 @@ async def make_prediction(symbol: str) -> PredictionResponse:
         raise PredictionError(f"Failed to generate prediction: {str(e)}")
 
 
-@router.get("/predict", response_model=PredictionResponse)
-async def predict(symbol: str):
+async def generate_predictions(symbols: List[str], state: State) -> dict:
+    """
+    Batch variant of generate_prediction: fetch all symbols concurrently and
+    run XGBoost once over all of them. Returns symbol -> PredictionResponse,
+    or the exception that prevented a prediction for that symbol.
+    """
+    lstm_model = state.lstm_model
+    xgb_model = state.xgb_model
+    
+    # Check if models are loaded
+    if lstm_model is None or xgb_model is None:
+        return {symbol: ModelLoadError("LSTM or XGBoost") for symbol in symbols}
+    
+    # Fetch stock data
+    frames = await asyncio.gather(
+        *(fetch_stock_data(state.http, symbol) for symbol in symbols),
+        return_exceptions=True
+    )
+    
+    results = {}
+    fetched = {}
+    for symbol, df in zip(symbols, frames):
+        if isinstance(df, Exception):
+            results[symbol] = DataFetchError(str(df))
+        elif len(df) < MIN_HISTORY:
+            results[symbol] = DataFetchError(f"Not enough price history for {symbol}")
+        else:
+            fetched[symbol] = df
+    
+    if not fetched:
+        return results
+    
+    # Make predictions: one XGBoost call for the whole batch
+    try:
+        signals = predict_signals_batch(xgb_model, fetched)
+    except Exception as e:
+        logger.error(f"Batch prediction failed for {list(fetched)}: {str(e)}")
+        error = PredictionError(f"Failed to generate prediction: {str(e)}")
+        for symbol in fetched:
+            results[symbol] = error
+        return results
+    
+    # Per-symbol steps are isolated so one failure doesn't mark the rest
+    for symbol, df in fetched.items():
+        try:
+            signal, confidence = signals[symbol]
+            prediction = PredictionResponse(
+                symbol=symbol,
+                predicted_price=float(predict_price(lstm_model, df)),
+                signal=signal,
+                confidence=float(confidence),
+                model_version=settings.MODEL_VERSION,
+                cached=False
+            )
+            await save_prediction_to_cache(symbol, prediction)
+            results[symbol] = prediction
+        except Exception as e:
+            logger.error(f"Prediction failed for {symbol}: {str(e)}")
+            results[symbol] = PredictionError(f"Failed to generate prediction: {str(e)}")
+    
+    return results
+
+
+@router.get(
+    "/predict",
+    response_model=None,
+    responses={200: {"model": PredictionResponse}}
+)
+async def predict(symbol: str, state: State = Depends(get_app_state)):
     """
     Get stock prediction for a single symbol using LIVE DATA
     
@@ -130,11 +184,25 @@ async def predict(symbol: str):
     - Confidence score (0-1)
     - Timestamp and model version
     """
-    return await make_prediction(symbol)
+    symbol = validate_stock_symbol(symbol)
+    
+    # Serve cached predictions as stored bytes, skipping model validation
+    cached_payload = await get_prediction_from_cache(symbol)
+    if cached_payload:
+        return Response(
+            content=cached_payload,
+            media_type="application/json",
+            headers={"X-Cached": "true"}
+        )
+    
+    return await generate_prediction(symbol, state)
 
 
 @router.post("/predict/batch", response_model=BatchPredictionResponse)
-async def predict_batch(request: BatchPredictionRequest):
+async def predict_batch(
+    request: BatchPredictionRequest,
+    state: State = Depends(get_app_state)
+):
     """
     Get stock predictions for multiple symbols (max 10)
     
@@ -147,17 +215,27 @@ async def predict_batch(request: BatchPredictionRequest):
     # Validate symbols
     symbols = validate_symbols_batch(request.symbols)
     
+    # Serve cached symbols, predict the rest in one batch
+    cached_payloads = await asyncio.gather(
+        *(get_prediction_from_cache(symbol) for symbol in symbols)
+    )
+    results = {}
+    for symbol, payload in zip(symbols, cached_payloads):
+        if payload:
+            results[symbol] = PredictionResponse.model_validate_json(payload)
+    
+    pending = [symbol for symbol in dict.fromkeys(symbols) if symbol not in results]
+    if pending:
+        results.update(await generate_predictions(pending, state))
+    
     predictions = []
     successful = 0
     failed = 0
     
     for symbol in symbols:
-        try:
-            prediction = await make_prediction(symbol)
-            predictions.append(prediction)
-            successful += 1
-        except Exception as e:
-            logger.error(f"Batch prediction failed for {symbol}: {str(e)}")
+        result = results[symbol]
+        if isinstance(result, Exception):
+            logger.error(f"Batch prediction failed for {symbol}: {str(result)}")
             failed += 1
             # Add error placeholder
             predictions.append(
@@ -166,11 +244,13 @@ async def predict_batch(request: BatchPredictionRequest):
                     predicted_price=0.0,
                     signal="ERROR",
                     confidence=0.0,
-                    timestamp=datetime.now(),
                     model_version=settings.MODEL_VERSION,
                     cached=False
                 )
             )
+        else:
+            predictions.append(result)
+            successful += 1
     
     return BatchPredictionResponse(
         predictions=predictions,
@@ -180,8 +260,34 @@ async def predict_batch(request: BatchPredictionRequest):
     )
 
 
+DEMO_DAYS = 100
+
+
+@lru_cache(maxsize=256)
+def generate_demo_ohlcv(symbol: str) -> np.ndarray:
+    """
+    Deterministic mock data for a symbol as a read-only (5, DEMO_DAYS)
+    float32 array with rows close, open, high, low, volume
+    """
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    buf = np.empty((5, DEMO_DAYS), dtype=np.float32)
+    
+    # Create realistic price movement
+    base_price = rng.uniform(50, 500)
+    buf[0] = base_price * np.exp(np.cumsum(rng.normal(0.001, 0.02, DEMO_DAYS)))
+    
+    # Open/high/low noise in a single draw
+    low = np.array([[0.98], [1.00], [0.95]])
+    high = np.array([[1.02], [1.05], [1.00]])
+    buf[1:4] = buf[0] * rng.uniform(low, high, (3, DEMO_DAYS))
+    buf[4] = rng.uniform(1000000, 10000000, DEMO_DAYS)
+    
+    buf.setflags(write=False)
+    return buf
+
+
 @router.get("/predict/demo", response_model=PredictionResponse)
-async def predict_demo(symbol: str):
+async def predict_demo(symbol: str, state: State = Depends(get_app_state)):
     """
     DEMO ENDPOINT - Get stock prediction using mock data (for testing/demo purposes)
     
@@ -198,6 +304,8 @@ async def predict_demo(symbol: str):
     """
     # Validate symbol
     symbol = validate_stock_symbol(symbol)
+    lstm_model = state.lstm_model
+    xgb_model = state.xgb_model
     
     # Check if models are loaded
     if lstm_model is None or xgb_model is None:
@@ -206,21 +314,12 @@ async def predict_demo(symbol: str):
     logger.info(f"Demo prediction for symbol: {symbol}")
     
     # Generate mock stock data (100 days)
-    np.random.seed(hash(symbol) % 10000)
-    dates = pd.date_range(end=datetime.now(), periods=100)
-    base_price = np.random.uniform(50, 500)
-    
-    # Create realistic price movement
-    returns = np.random.normal(0.001, 0.02, 100)
-    prices = base_price * np.exp(np.cumsum(returns))
-    
-    df = pd.DataFrame({
-        'close': prices,
-        'open': prices * np.random.uniform(0.98, 1.02, 100),
-        'high': prices * np.random.uniform(1.00, 1.05, 100),
-        'low': prices * np.random.uniform(0.95, 1.00, 100),
-        'volume': np.random.uniform(1000000, 10000000, 100)
-    }, index=dates)
+    dates = pd.date_range(end=datetime.now(), periods=DEMO_DAYS)
+    df = pd.DataFrame(
+        generate_demo_ohlcv(symbol).T,
+        index=dates,
+        columns=['close', 'open', 'high', 'low', 'volume']
+    )
     
     try:
         # Make predictions using the trained models
@@ -232,7 +331,6 @@ async def predict_demo(symbol: str):
             predicted_price=float(predicted_price),
             signal=signal,
             confidence=float(confidence),
-            timestamp=datetime.now(),
             model_version=settings.MODEL_VERSION + "-DEMO",
             cached=False
         )
@@ -0,0 +1,24 @@
+# app/server.py
+"""
+Production entrypoint: uvloop event loop, httptools HTTP parser, one worker per CPU
+Run with: python -m app.server
+"""
+
+import os
+import uvicorn
+
+
+def main():
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count() or 1,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,31 @@
 # app/services/xgb_service.py
 
+from functools import lru_cache
+import hashlib
+from pathlib import Path
+import threading
+import zlib
 import joblib
 import pandas as pd
 import numpy as np
+from scipy.signal import lfilter
+from app.core.jit import njit
 
+@lru_cache(maxsize=1)
 def load_xgb_model():
+    """Load the XGBoost model once per process"""
     return joblib.load("app/models/xgb_model.pkl")
 
 
-def calculate_rsi(data, period=14):
-    """Calculate Relative Strength Index"""
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-
-def calculate_macd(data, fast=12, slow=26, signal=9):
-    """Calculate MACD (Moving Average Convergence Divergence)"""
-    ema_fast = data.ewm(span=fast, adjust=False).mean()
-    ema_slow = data.ewm(span=slow, adjust=False).mean()
-    macd = ema_fast - ema_slow
-    macd_signal = macd.ewm(span=signal, adjust=False).mean()
-    macd_histogram = macd - macd_signal
-    return macd, macd_signal, macd_histogram
+def ema(values, span):
+    """
+    Exponential moving average of a 1-D float array, identical to
+    pandas ewm(span=span, adjust=False).mean() but run as a single IIR filter
+    """
+    alpha = 2.0 / (span + 1)
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], seeded so that y[0] = x[0]
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[values[0] * (1 - alpha)])
+    return out
 
 
 def get_news_sentiment(symbol):
@@ -39,81 +39,274 @@ def get_news_sentiment(symbol):
     - Twitter/Reddit sentiment analysis
     - Financial news APIs
     """
-    # Placeholder: Random sentiment for now
+    # Placeholder: deterministic per-symbol value in [-0.5, 0.5]
     # In production, replace with actual API call
-    import random
-    random.seed(hash(symbol) % 100)
-    sentiment = random.uniform(-0.5, 0.5)
-    return sentiment
+    return zlib.crc32(symbol.encode()) / 0xFFFFFFFF - 0.5
 
 
-def create_features(df):
-    """Create advanced features including technical indicators and lag features"""
-    df = df.copy()
+# Fingerprint of the feature code in this module: on-disk feature caches (train_models*.py)
+# include it in their key so editing create_features/compute_features invalidates them
+FEATURES_VERSION = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:12]
+
+
+# Columns added by create_features, in output order
+FEATURE_FRAME_COLUMNS = [
+    "returns", "ma_10", "ma_30", "volatility",
+    "rsi", "macd", "macd_signal", "macd_histogram",
+    "close_lag_1", "returns_lag_1", "close_lag_2", "returns_lag_2",
+    "close_lag_3", "returns_lag_3", "close_lag_4", "returns_lag_4",
+    "close_lag_5", "returns_lag_5",
+    "momentum_5", "momentum_10",
+    "volume_ma_10", "volume_ratio",
+    "bb_middle", "bb_upper", "bb_lower", "bb_position"
+]
+
+
+@njit(cache=True)
+def _divide(num, den):
+    """IEEE division like NumPy (x/0 -> +-inf, 0/0 -> nan) instead of ZeroDivisionError"""
+    if den == 0.0:
+        if num == 0.0 or num != num:
+            return np.nan
+        return np.inf if num > 0 else -np.inf
+    return num / den
+
+
+@njit(cache=True)
+def _window_mean(values, end, window):
+    """Mean of values[end-window+1:end+1], summed per window so zero windows stay exactly zero"""
+    total = 0.0
+    for j in range(end - window + 1, end + 1):
+        total += values[j]
+    return total / window
+
+
+@njit(cache=True)
+def _window_std(values, end, window):
+    """Sample std (ddof=1) of values[end-window+1:end+1], two-pass for stability"""
+    total = 0.0
+    for j in range(end - window + 1, end + 1):
+        total += values[j]
+    mean = total / window
+    ssq = 0.0
+    for j in range(end - window + 1, end + 1):
+        ssq += (values[j] - mean) ** 2
+    return np.sqrt(ssq / (window - 1))
+
+
+@njit(cache=True)
+def compute_features(close, volume, out):
+    """
+    Fill out (n, len(FEATURE_FRAME_COLUMNS)) with all features in one pass.
+    Matches the pandas definitions: NaN during each indicator's warm-up,
+    rolling means/stds over trailing windows, adjust=False EMAs for MACD.
+    """
+    n = close.shape[0]
+    out[:, :] = np.nan
     
-    # Basic features
-    df["returns"] = df["close"].pct_change()
-    df["ma_10"] = df["close"].rolling(10).mean()
-    df["ma_30"] = df["close"].rolling(30).mean()
-    df["volatility"] = df["returns"].rolling(10).std()
+    alpha_fast = 2.0 / (12 + 1)
+    alpha_slow = 2.0 / (26 + 1)
+    alpha_signal = 2.0 / (9 + 1)
+    ema_fast = 0.0
+    ema_slow = 0.0
+    macd_signal = 0.0
     
-    # RSI (Relative Strength Index)
-    df["rsi"] = calculate_rsi(df["close"], period=14)
+    for i in range(n):
+        c = close[i]
+        
+        # Basic features
+        if i >= 1:
+            out[i, 0] = c / close[i - 1] - 1.0
+        
+        if i >= 9:
+            out[i, 1] = _window_mean(close, i, 10)
+        if i >= 29:
+            out[i, 2] = _window_mean(close, i, 30)
+        if i >= 10:
+            out[i, 3] = _window_std(out[:, 0], i, 10)
+        
+        # RSI: simple 14-period averages of gains/losses (first delta is 0).
+        # Summed per window so all-zero windows stay exactly zero.
+        if i >= 13:
+            gain = 0.0
+            loss = 0.0
+            for j in range(i - 13, i + 1):
+                delta = close[j] - close[j - 1] if j >= 1 else 0.0
+                if delta > 0:
+                    gain += delta
+                else:
+                    loss -= delta
+            rs = _divide(gain / 14, loss / 14)
+            out[i, 4] = 100.0 - 100.0 / (1.0 + rs)
+        
+        # MACD (EMAs seeded with the first value)
+        if i == 0:
+            ema_fast = c
+            ema_slow = c
+        else:
+            ema_fast = alpha_fast * c + (1.0 - alpha_fast) * ema_fast
+            ema_slow = alpha_slow * c + (1.0 - alpha_slow) * ema_slow
+        macd = ema_fast - ema_slow
+        if i == 0:
+            macd_signal = macd
+        else:
+            macd_signal = alpha_signal * macd + (1.0 - alpha_signal) * macd_signal
+        out[i, 5] = macd
+        out[i, 6] = macd_signal
+        out[i, 7] = macd - macd_signal
+        
+        # Lag features (previous 5 days)
+        for k in range(1, 6):
+            if i >= k:
+                out[i, 6 + 2 * k] = close[i - k]
+                out[i, 7 + 2 * k] = out[i - k, 0]
+        
+        # Momentum
+        if i >= 5:
+            out[i, 18] = c - close[i - 5]
+        if i >= 10:
+            out[i, 19] = c - close[i - 10]
+        
+        # Volume features
+        if i >= 9:
+            out[i, 20] = _window_mean(volume, i, 10)
+            out[i, 21] = _divide(volume[i], out[i, 20])
+        
+        # Bollinger Bands
+        if i >= 19:
+            bb_middle = _window_mean(close, i, 20)
+            bb_std = _window_std(close, i, 20)
+            bb_upper = bb_middle + bb_std * 2
+            bb_lower = bb_middle - bb_std * 2
+            out[i, 22] = bb_middle
+            out[i, 23] = bb_upper
+            out[i, 24] = bb_lower
+            out[i, 25] = _divide(c - bb_lower, bb_upper - bb_lower)
+
+
+def create_features(df):
+    """Create advanced features including technical indicators and lag features"""
+    close = df["close"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
     
-    # MACD indicators
-    df["macd"], df["macd_signal"], df["macd_histogram"] = calculate_macd(df["close"])
+    # Input columns and features share one float64 matrix, so the result is a single block
+    n_inputs = df.shape[1]
+    data = np.empty((len(df), n_inputs + len(FEATURE_FRAME_COLUMNS)))
+    data[:, :n_inputs] = df.to_numpy(dtype=np.float64)
+    compute_features(close, volume, data[:, n_inputs:])
     
-    # Lag features (previous 5 days prices)
-    for i in range(1, 6):
-        df[f"close_lag_{i}"] = df["close"].shift(i)
-        df[f"returns_lag_{i}"] = df["returns"].shift(i)
+    valid = ~np.isnan(data).any(axis=1)
+    return pd.DataFrame(
+        data[valid],
+        index=df.index[valid],
+        columns=[*df.columns, *FEATURE_FRAME_COLUMNS]
+    )
+
+
+# Model input features, in training order (news sentiment is appended last)
+FEATURE_COLUMNS = (
+    "returns", "ma_10", "ma_30", "volatility",
+    "rsi", "macd", "macd_signal", "macd_histogram",
+    "close_lag_1", "close_lag_2", "close_lag_3", "close_lag_4", "close_lag_5",
+    "returns_lag_1", "returns_lag_2", "returns_lag_3", "returns_lag_4", "returns_lag_5",
+    "momentum_5", "momentum_10",
+    "volume_ratio", "bb_position"
+)
+
+# Longest lookback among the features (ma_30)
+MIN_HISTORY = 30
+
+
+def compute_latest_features(close, volume):
+    """
+    Compute FEATURE_COLUMNS for the most recent row only.
+    Same definitions as create_features, but rolling windows are evaluated
+    once on the tail instead of for every row.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    if len(close) < MIN_HISTORY:
+        raise ValueError(f"Need at least {MIN_HISTORY} rows of price history, got {len(close)}")
     
-    # Price momentum
-    df["momentum_5"] = df["close"] - df["close"].shift(5)
-    df["momentum_10"] = df["close"] - df["close"].shift(10)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Returns for the last 16 days (enough for volatility and return lags)
+        returns = close[-16:] / close[-17:-1] - 1.0
+        
+        # RSI over the last 14 deltas
+        delta = np.diff(close[-15:])
+        gain = delta[delta > 0].sum() / 14
+        loss = -delta[delta < 0].sum() / 14
+        rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+        
+        # MACD needs the full EMA recursion
+        macd_line = ema(close, 12) - ema(close, 26)
+        macd = macd_line[-1]
+        macd_signal = ema(macd_line, 9)[-1]
+        
+        # Bollinger Bands
+        bb_middle = close[-20:].mean()
+        bb_std = close[-20:].std(ddof=1)
+        bb_upper = bb_middle + bb_std * 2
+        bb_lower = bb_middle - bb_std * 2
+        bb_position = (close[-1] - bb_lower) / (bb_upper - bb_lower)
+        
+        return np.array([
+            returns[-1],
+            close[-10:].mean(),
+            close[-30:].mean(),
+            returns[-10:].std(ddof=1),
+            rsi,
+            macd,
+            macd_signal,
+            macd - macd_signal,
+            close[-2], close[-3], close[-4], close[-5], close[-6],
+            returns[-2], returns[-3], returns[-4], returns[-5], returns[-6],
+            close[-1] - close[-6],
+            close[-1] - close[-11],
+            volume[-1] / volume[-10:].mean(),
+            bb_position
+        ])
+
+
+# Per-thread model input buffer, reused across predictions (grown on demand)
+_buffers = threading.local()
+
+
+def _feature_buffer(rows):
+    """Return a (rows, features + sentiment) float32 view into this thread's buffer"""
+    buf = getattr(_buffers, "features", None)
+    if buf is None or buf.shape[0] < rows:
+        buf = np.empty((rows, len(FEATURE_COLUMNS) + 1), dtype=np.float32)
+        _buffers.features = buf
+    return buf[:rows]
+
+
+def predict_signals_batch(model, frames):
+    """
+    Predict trading signals for several symbols with a single model call.
+    frames maps symbol -> OHLCV DataFrame; returns symbol -> (signal, confidence)
+    """
+    symbols = list(frames)
+    if not symbols:
+        return {}
     
-    # Volume features
-    df["volume_ma_10"] = df["volume"].rolling(10).mean()
-    df["volume_ratio"] = df["volume"] / df["volume_ma_10"]
+    # One row per symbol: latest features plus news sentiment.
+    # float32 is what XGBoost uses internally, so the booster reads it without a copy
+    features = _feature_buffer(len(symbols))
+    for row, symbol in enumerate(symbols):
+        df = frames[symbol]
+        features[row, :-1] = compute_latest_features(df["close"], df["volume"])
+        features[row, -1] = get_news_sentiment(symbol)
     
-    # Bollinger Bands
-    df["bb_middle"] = df["close"].rolling(20).mean()
-    bb_std = df["close"].rolling(20).std()
-    df["bb_upper"] = df["bb_middle"] + (bb_std * 2)
-    df["bb_lower"] = df["bb_middle"] - (bb_std * 2)
-    df["bb_position"] = (df["close"] - df["bb_lower"]) / (df["bb_upper"] - df["bb_lower"])
+    # Binary booster returns P(BUY) per row; skips the sklearn wrapper's validation and DMatrix
+    proba = model.get_booster().inplace_predict(features)
     
-    df = df.dropna()
-    return df
+    return {
+        symbol: ("BUY", float(p)) if p > 0.5 else ("SELL", float(1.0 - p))
+        for symbol, p in zip(symbols, proba)
+    }
 
 
 def predict_signal(model, df, symbol="UNKNOWN"):
     """Predict trading signal with advanced features"""
-    df = create_features(df)
-    
-    # Get news sentiment
-    news_sentiment = get_news_sentiment(symbol)
-    
-    latest = df.iloc[-1]
-    
-    # Feature list matching training
-    feature_columns = [
-        "returns", "ma_10", "ma_30", "volatility",
-        "rsi", "macd", "macd_signal", "macd_histogram",
-        "close_lag_1", "close_lag_2", "close_lag_3", "close_lag_4", "close_lag_5",
-        "returns_lag_1", "returns_lag_2", "returns_lag_3", "returns_lag_4", "returns_lag_5",
-        "momentum_5", "momentum_10",
-        "volume_ratio", "bb_position"
-    ]
-    
-    features = latest[feature_columns].values.reshape(1, -1)
-    
-    # Add news sentiment as additional feature
-    features = np.append(features, [[news_sentiment]], axis=1)
-    
-    prediction = model.predict(features)[0]
-    probability = model.predict_proba(features)[0].max()
-    
-    signal = "BUY" if prediction == 1 else "SELL"
-    
-    return signal, float(probability)
\ No newline at end of file
+    return predict_signals_batch(model, {symbol: df})[symbol]
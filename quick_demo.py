@@ -12,6 +12,7 @@ from app.services.xgb_service import load_xgb_model, predict_signal
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 # Load models
 print("Loading trained models...")
@@ -25,33 +26,46 @@ print("STOCK PREDICTION DEMO - Using Trained ML Models")
 print("="*60)
 
 symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
+days = 100
 
-for symbol in symbols:
-    # Generate realistic data based on symbol
-    np.random.seed(hash(symbol) % 10000)
-    dates = pd.date_range(end=datetime.now(), periods=100)
-    
-    # Base prices for different stocks
-    base_prices = {'AAPL': 180, 'GOOGL': 140, 'MSFT': 380, 'TSLA': 250}
-    base_price = base_prices.get(symbol, 150)
-    
-    # Create realistic price movement
-    returns = np.random.normal(0.001, 0.02, 100)
-    prices = base_price * np.exp(np.cumsum(returns))
-    
+# Base prices for different stocks
+base_prices = {'AAPL': 180, 'GOOGL': 140, 'MSFT': 380, 'TSLA': 250}
+base_price_arr = np.array([base_prices.get(symbol, 150) for symbol in symbols], dtype=float)
+
+# Generate realistic price movement for all symbols at once: one (symbols, days) matrix per column
+rng = np.random.default_rng(42)
+shape = (len(symbols), days)
+returns = rng.normal(0.001, 0.02, shape)
+prices = base_price_arr[:, None] * np.exp(np.cumsum(returns, axis=1))
+opens = prices * rng.uniform(0.98, 1.02, shape)
+highs = prices * rng.uniform(1.00, 1.05, shape)
+lows = prices * rng.uniform(0.95, 1.00, shape)
+volumes = rng.uniform(10000000, 100000000, shape)
+dates = pd.date_range(end=datetime.now(), periods=days)
+
+def process_symbol(row):
+    """Build one symbol's frame and run both models on it"""
+    symbol = symbols[row]
     df = pd.DataFrame({
-        'close': prices,
-        'open': prices * np.random.uniform(0.98, 1.02, 100),
-        'high': prices * np.random.uniform(1.00, 1.05, 100),
-        'low': prices * np.random.uniform(0.95, 1.00, 100),
-        'volume': np.random.uniform(10000000, 100000000, 100)
+        'close': prices[row],
+        'open': opens[row],
+        'high': highs[row],
+        'low': lows[row],
+        'volume': volumes[row]
     }, index=dates)
     
     # Make predictions
     predicted_price = predict_price(lstm_model, df)
     signal, confidence = predict_signal(xgb_model, df, symbol)
     
-    current_price = df['close'].iloc[-1]
+    return symbol, df['close'].iloc[-1], predicted_price, signal, confidence
+
+
+# Symbols are independent and the native predict calls release the GIL
+with ThreadPoolExecutor(max_workers=len(symbols)) as executor:
+    results = list(executor.map(process_symbol, range(len(symbols))))
+
+for symbol, current_price, predicted_price, signal, confidence in results:
     change_pct = ((predicted_price - current_price) / current_price) * 100
     
     print(f"\n{symbol}:")
@@ -65,5 +79,5 @@ for symbol in symbols:
 print("\n" + "="*60)
 print("Models: LSTM (Price Prediction) + XGBoost (Signal)")
 print("Features: 23 technical indicators (RSI, MACD, Lag features)")
-print("Training: GridSearchCV with TimeSeriesSplit")
+print("Training: Optuna search with TimeSeriesSplit")
 print("="*60)
@@ -1,25 +1,33 @@
 #!/usr/bin/env python3
 """
 Simple script to run the Stock Prediction API
-Run this with: python run_api.py
+Run this with: python run_api.py          (multi-worker, uvloop + httptools)
+          or:  python run_api.py --dev    (single worker with auto-reload)
 """
 
-import subprocess
-import sys
+import argparse
+import uvicorn
+from app import server
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the Stock Prediction API")
+    parser.add_argument("--dev", action="store_true", help="enable auto-reload (single worker)")
+    args = parser.parse_args()
+    
     print("🚀 Starting Stock Prediction API...")
     print("=" * 50)
     
     try:
-        # Run uvicorn using Python module syntax
-        subprocess.run([
-            sys.executable, "-m", "uvicorn",
-            "app.main:app",
-            "--reload",
-            "--host", "0.0.0.0",
-            "--port", "8000"
-        ])
+        if args.dev:
+            uvicorn.run(
+                "app.main:app",
+                host="0.0.0.0",
+                port=8000,
+                reload=True,
+                log_level="info"
+            )
+        else:
+            server.main()
     except KeyboardInterrupt:
         print("\n\n✅ API stopped successfully!")
     except Exception as e:
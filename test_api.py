@@ -7,9 +7,14 @@ Tests all endpoints and features
 import requests
 import json
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:8000"
 
+# Shared keep-alive session: one pooled connection instead of a new TCP connect per call
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
 def print_section(title):
     print("\n" + "="*70)
     print(f"  {title}")
@@ -18,7 +23,7 @@ def print_section(title):
 def test_root():
     """Test root endpoint"""
     print_section("Testing Root Endpoint")
-    response = requests.get(f"{BASE_URL}/")
+    response = SESSION.get(f"{BASE_URL}/")
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
     assert response.status_code == 200
@@ -27,7 +32,7 @@ def test_root():
 def test_health():
     """Test health check"""
     print_section("Testing Health Check")
-    response = requests.get(f"{BASE_URL}/health")
+    response = SESSION.get(f"{BASE_URL}/health")
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
     assert response.status_code == 200
@@ -36,7 +41,7 @@ def test_health():
 def test_metrics():
     """Test metrics endpoint"""
     print_section("Testing Metrics")
-    response = requests.get(f"{BASE_URL}/metrics")
+    response = SESSION.get(f"{BASE_URL}/metrics")
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
     assert response.status_code == 200
@@ -46,7 +51,7 @@ def test_single_prediction():
     """Test single stock prediction"""
     print_section("Testing Single Prediction")
     symbol = "AAPL"
-    response = requests.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
+    response = SESSION.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -69,14 +74,14 @@ def test_cached_prediction():
     
     # First request
     print("First request (should not be cached)...")
-    response1 = requests.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
+    response1 = SESSION.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
     if response1.status_code == 200:
         data1 = response1.json()
         print(f"Cached: {data1['cached']}")
         
         # Second request (should be cached)
         print("\nSecond request (should be cached)...")
-        response2 = requests.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
+        response2 = SESSION.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
         data2 = response2.json()
         print(f"Cached: {data2['cached']}")
         
@@ -92,7 +97,7 @@ def test_batch_prediction():
     print_section("Testing Batch Prediction")
     symbols = ["AAPL", "GOOGL", "MSFT"]
     
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/api/v1/predict/batch",
         json={"symbols": symbols}
     )
@@ -122,7 +127,7 @@ def test_invalid_symbol():
     invalid_symbols = ["ABC123", "TOOLONG", "123", ""]
     
     for symbol in invalid_symbols:
-        response = requests.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
+        response = SESSION.get(f"{BASE_URL}/api/v1/predict?symbol={symbol}")
         print(f"\nSymbol: '{symbol}'")
         print(f"Status: {response.status_code}")
         if response.status_code != 200:
@@ -134,7 +139,7 @@ def test_invalid_symbol():
 def test_api_docs():
     """Test API documentation"""
     print_section("Testing API Documentation")
-    response = requests.get(f"{BASE_URL}/docs")
+    response = SESSION.get(f"{BASE_URL}/docs")
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
         print("✓ API docs available at /docs")